@@ -0,0 +1,190 @@
+"""Tests for xbee."""
+from unittest import mock
+
+import pytest
+
+from zhaquirks.xbee import xbee3_io
+from zhaquirks.xbee.xbee_io import IOSample, XBeeOnOff, XbeeSensor
+
+
+def test_io_sample_deserialize():
+    """Test io sample report with digital and analog pins."""
+    data = b'\x1c\x07\x01\x14\x05\x02\x1f'
+
+    values, rest = IOSample.deserialize(data)
+    assert rest == b''
+    assert values.digital_pins_mask == 0x1c07
+    assert values.digital_samples_mask == 0x1405
+    assert values.analog_pins_mask == 0x01
+    assert values.analog_samples == (0x021f, 0, 0, 0, 0, 0, 0, 0)
+
+
+def test_io_sample_deserialize_multiple_analog():
+    """Test io sample report with more than one analog pin."""
+    data = b'\x00\x01\x05\x00\x01\x01\x02\x03\x04'
+
+    values, _ = IOSample.deserialize(data)
+    assert values.analog_pins_mask == 0x05
+    assert values.analog_samples == (0x0102, 0, 0x0304, 0, 0, 0, 0, 0)
+
+
+def test_digital_io_cluster_deserialize():
+    """Test io sample report split over the zcl frame header."""
+    cluster = XbeeSensor.DigitalIOCluster(mock.MagicMock())
+
+    tsn, frame_type, is_reply, command_id = 0x1c, 0x01, False, 0x07
+    data = b'\x01\x14\x05\x02\x1f'
+
+    d = cluster.deserialize(tsn, frame_type, is_reply, command_id, data)
+    assert d[1] == 0x0000
+    assert d[3][0].digital_pins_mask == 0x1c07
+    assert d[3][0].analog_samples == (0x021f, 0, 0, 0, 0, 0, 0, 0)
+
+
+def test_digital_io_cluster_deserialize_analog_only():
+    """Test io sample report without digital pins has no digital samples."""
+    cluster = XbeeSensor.DigitalIOCluster(mock.MagicMock())
+
+    tsn, frame_type, is_reply, command_id = 0x00, 0x01, False, 0x00
+    data = b'\x01\x02\x1f'
+
+    d = cluster.deserialize(tsn, frame_type, is_reply, command_id, data)
+    assert d[1] == 0x0000
+    assert d[3][0].digital_pins_mask == 0x0000
+    assert d[3][0].digital_samples_mask == 0x0000
+    assert d[3][0].analog_samples == (0x021f, 0, 0, 0, 0, 0, 0, 0)
+
+
+def test_digital_io_cluster_deserialize_zero_command_id():
+    """Test io sample report whose digital mask low byte is zero."""
+    cluster = XbeeSensor.DigitalIOCluster(mock.MagicMock())
+
+    tsn, frame_type, is_reply, command_id = 0x1c, 0x01, False, 0x00
+    data = b'\x00\x14\x00'
+
+    d = cluster.deserialize(tsn, frame_type, is_reply, command_id, data)
+    assert d[1] == 0x0000
+    assert d[3][0].digital_pins_mask == 0x1c00
+    assert d[3][0].digital_samples_mask == 0x1400
+    assert d[3][0].analog_pins_mask == 0x00
+
+
+def test_io_sample_deserialize_too_short():
+    """Test truncated io sample reports raise ValueError."""
+    with pytest.raises(ValueError):
+        IOSample.deserialize(b'\x00\x01')
+    with pytest.raises(ValueError):
+        IOSample.deserialize(b'\x00\x01\x00\x00')
+    with pytest.raises(ValueError):
+        IOSample.deserialize(b'\x00\x01\x01\x02\x1f')
+
+
+def _digital_io_cluster(cluster_cls, endpoint_ids):
+    """Return a digital IO cluster and the endpoints of its device."""
+    endpoints = {ep_id: mock.MagicMock() for ep_id in endpoint_ids}
+    endpoint = mock.MagicMock()
+    endpoint.device.__getitem__.side_effect = endpoints.__getitem__
+    return cluster_cls(endpoint), endpoints
+
+
+def test_digital_io_cluster_update_pins():
+    """Test io sample report updates the on/off cluster of active pins."""
+    cluster, endpoints = _digital_io_cluster(
+        XbeeSensor.DigitalIOCluster, (0xd0, 0xd1))
+
+    values, _ = IOSample.deserialize(b'\x00\x03\x00\x00\x02')
+    cluster.handle_cluster_general_request(0x00, 0x0000, [values])
+
+    endpoints[0xd0].on_off._update_attribute.assert_called_once_with(0, 0)
+    endpoints[0xd1].on_off._update_attribute.assert_called_once_with(0, 1)
+
+
+def test_digital_io_cluster_update_changed_pins():
+    """Test repeated io sample reports only update changed pins."""
+    cluster, endpoints = _digital_io_cluster(
+        XbeeSensor.DigitalIOCluster, (0xd0, 0xd1))
+
+    values, _ = IOSample.deserialize(b'\x00\x03\x00\x00\x02')
+    cluster.handle_cluster_general_request(0x00, 0x0000, [values])
+    cluster.handle_cluster_general_request(0x00, 0x0000, [values])
+    assert endpoints[0xd0].on_off._update_attribute.call_count == 1
+    assert endpoints[0xd1].on_off._update_attribute.call_count == 1
+
+    values, _ = IOSample.deserialize(b'\x00\x03\x00\x00\x03')
+    cluster.handle_cluster_general_request(0x00, 0x0000, [values])
+    endpoints[0xd0].on_off._update_attribute.assert_called_with(0, 1)
+    assert endpoints[0xd1].on_off._update_attribute.call_count == 1
+
+
+def test_digital_io_cluster_update_returning_pin():
+    """Test a pin missing from a report is updated when it returns."""
+    cluster, endpoints = _digital_io_cluster(
+        XbeeSensor.DigitalIOCluster, (0xd0, 0xd1))
+
+    values, _ = IOSample.deserialize(b'\x00\x03\x00\x00\x02')
+    cluster.handle_cluster_general_request(0x00, 0x0000, [values])
+    values, _ = IOSample.deserialize(b'\x00\x01\x00\x00\x00')
+    cluster.handle_cluster_general_request(0x00, 0x0000, [values])
+    assert endpoints[0xd0].on_off._update_attribute.call_count == 1
+    assert endpoints[0xd1].on_off._update_attribute.call_count == 1
+
+    values, _ = IOSample.deserialize(b'\x00\x03\x00\x00\x02')
+    cluster.handle_cluster_general_request(0x00, 0x0000, [values])
+    assert endpoints[0xd0].on_off._update_attribute.call_count == 1
+    assert endpoints[0xd1].on_off._update_attribute.call_count == 2
+    endpoints[0xd1].on_off._update_attribute.assert_called_with(0, 1)
+
+
+def test_digital_io_cluster_skip_pin_without_endpoint():
+    """Test active pins without an endpoint are skipped."""
+    cluster, endpoints = _digital_io_cluster(
+        XbeeSensor.DigitalIOCluster, (0xd0,))
+
+    values, _ = IOSample.deserialize(b'\x00\x41\x00\x00\x41')
+    cluster.handle_cluster_general_request(0x00, 0x0000, [values])
+
+    endpoints[0xd0].on_off._update_attribute.assert_called_once_with(0, 1)
+
+
+def test_xbee3_digital_io_cluster_update_pins_8_9():
+    """Test xbee3 io sample report updates the endpoints of pins 8 and 9."""
+    cluster, endpoints = _digital_io_cluster(
+        xbee3_io.XBee3Sensor.DigitalIOCluster, (0xd8, 0xd9))
+
+    values, _ = xbee3_io.IOSample.deserialize(b'\x03\x00\x00\x02\x00')
+    cluster.handle_cluster_general_request(0x00, 0x0000, [values])
+
+    endpoints[0xd8].on_off._update_attribute.assert_called_once_with(0, 0)
+    endpoints[0xd9].on_off._update_attribute.assert_called_once_with(0, 1)
+
+
+async def test_on_off_command_sets_pin():
+    """Test on/off command sets the pin of the endpoint."""
+    calls = []
+
+    async def remote_at(*args):
+        calls.append(args)
+
+    endpoint = mock.MagicMock()
+    endpoint.endpoint_id = 0xda
+    endpoint.device.remote_at = remote_at
+    cluster = XBeeOnOff(endpoint)
+
+    await cluster.command(0x01)
+    assert calls == [('P0', 0x05)]
+
+
+async def test_xbee3_on_off_command_sets_pin_8():
+    """Test xbee3 on/off command sets pin D8."""
+    calls = []
+
+    async def remote_at(*args):
+        calls.append(args)
+
+    endpoint = mock.MagicMock()
+    endpoint.endpoint_id = 0xd8
+    endpoint.device.remote_at = remote_at
+    cluster = xbee3_io.XBeeOnOff(endpoint)
+
+    await cluster.command(0x00)
+    assert calls == [('D8', 0x04)]
@@ -14,6 +14,7 @@ every x milliseconds, I recommend the later, since this will ensure
 the xbee stays alive in Home Assistant.
 """
 
+import collections
 import logging
 import struct
 import zigpy.types as t
@@ -34,6 +35,58 @@ DIO_APPLY_CHANGES = 0x02
 DIO_PIN_HIGH = 0x05
 DIO_PIN_LOW = 0x04
 ON_OFF_CMD = 0x0000
+# digital pins 0 - 12
+DIGITAL_PINS_MASK = 0x1fff
+
+# zcl tsn and command id, which hold the first two bytes of an IO sample
+_TSN_COMMAND_ID = struct.Struct('>BB')
+# digital mask, analog mask
+_IO_SAMPLE_MASKS = struct.Struct('>HB')
+_DIGITAL_SAMPLES = struct.Struct('>H')
+# analog samples, indexed by the number of active analog pins
+_ANALOG_SAMPLES = tuple(struct.Struct('>{}H'.format(n)) for n in range(9))
+
+IOSampleResult = collections.namedtuple(
+    'IOSampleResult',
+    'digital_pins_mask digital_samples_mask analog_pins_mask analog_samples')
+
+
+def _parse_io_sample(data):
+    """Parse an xbee IO sample report.
+
+    xbee digital sample format
+    Digital mask byte 0,1
+    Analog mask byte 3
+    Digital samples byte 4, 5, only sent when the digital mask is set
+    Analog Sample, 2 bytes per
+
+    Raises ValueError if the report is too short.
+    """
+    if len(data) < _IO_SAMPLE_MASKS.size:
+        raise ValueError("IO sample report too short")
+    digital_mask, analog_mask = _IO_SAMPLE_MASKS.unpack_from(data, 0)
+    offset = _IO_SAMPLE_MASKS.size
+    digital_sample = 0
+    if digital_mask:
+        if len(data) < offset + _DIGITAL_SAMPLES.size:
+            raise ValueError("IO sample report too short")
+        digital_sample = _DIGITAL_SAMPLES.unpack_from(data, offset)[0]
+        offset += _DIGITAL_SAMPLES.size
+    digital_mask &= DIGITAL_PINS_MASK
+    digital_sample &= DIGITAL_PINS_MASK
+    analog_struct = _ANALOG_SAMPLES[bin(analog_mask).count('1')]
+    if len(data) < offset + analog_struct.size:
+        raise ValueError("IO sample report too short")
+    samples = analog_struct.unpack_from(data, offset)
+    analog_samples = [0] * 8
+    analog_pins = analog_mask
+    for sample in samples:
+        # samples are ordered by pin, take the lowest set bit and clear it
+        analog_samples[(analog_pins & -analog_pins).bit_length() - 1] = sample
+        analog_pins &= analog_pins - 1
+
+    return IOSampleResult(
+        digital_mask, digital_sample, analog_mask, tuple(analog_samples)), b''
 
 
 class IOSample(bytes):
@@ -46,46 +99,8 @@ class IOSample(bytes):
 
     @classmethod
     def deserialize(cls, data):
-        """Deserialize an xbee IO sample report.
-
-        xbee digital sample format
-        Digital mask byte 0,1
-        Analog mask byte 3
-        Digital samples byte 4, 5
-        Analog Sample, 2 bytes per
-        """
-        digital_mask = data[0:2]
-        analog_mask = data[2:3]
-        digital_sample = data[3:5]
-        num_bits = 13
-        digital_pins = [
-            (int.from_bytes(digital_mask, byteorder='big') >> bit) & 1
-            for bit in range(num_bits - 1, -1, -1)]
-        digital_pins = list(reversed(digital_pins))
-        analog_pins = [
-            (int.from_bytes(analog_mask, byteorder='big') >> bit) & 1
-            for bit in range(8 - 1, -1, -1)]
-        analog_pins = list(reversed(analog_pins))
-        digital_samples = [
-            (int.from_bytes(digital_sample, byteorder='big') >> bit) & 1
-            for bit in range(num_bits - 1, -1, -1)]
-        digital_samples = list(reversed(digital_samples))
-        sample_index = 0
-        analog_samples = []
-        for apin in analog_pins:
-            if apin == 1:
-                analog_samples.append(
-                    int.from_bytes(data[5+sample_index:7+sample_index],
-                                   byteorder='big'))
-                sample_index += 1
-            else:
-                analog_samples.append(0)
-
-        return {
-            'digital_pins': digital_pins,
-            'analog_pins': analog_pins,
-            'digital_samples': digital_samples,
-            'analog_samples': analog_samples}, b''
+        """Deserialize an xbee IO sample report."""
+        return _parse_io_sample(data)
 
 # 4 AO lines
 # 10 digital
@@ -93,49 +108,45 @@ class IOSample(bytes):
 # device_type=1 device_version=0 input_clusters=[] output_clusters=[]>
 
 
-ENDPOINT_MAP = {
-    0: 0xd0,
-    1: 0xd1,
-    2: 0xd2,
-    3: 0xd3,
-    4: 0xd4,
-    5: 0xd5,
-    8: 0xd8,
-    9: 0xd9,
-    10: 0xda,
-    11: 0xdb,
-    12: 0xdc,
-}
+# Endpoint of each digital pin, None for pins without one.
+_PIN_TO_EP = (
+    0xd0, 0xd1, 0xd2, 0xd3, 0xd4, 0xd5, None, None,
+    0xd8, 0xd9, 0xda, 0xdb, 0xdc,
+)
+
+
+# Pin name of each endpoint, indexed by endpoint id - 0xd0.
+_EP_LOW_TO_PIN = (
+    'D0', 'D1', 'D2', 'D3', 'D4', 'D5', None, None,
+    'D8', 'D9', 'P0', 'P1', 'P2',
+)
 
 
 class XBeeOnOff(CustomCluster, OnOff):
     """XBee on/off cluster."""
 
-    ep_id_2_pin = {
-        0xd0: 'D0',
-        0xd1: 'D1',
-        0xd2: 'D2',
-        0xd3: 'D3',
-        0xd4: 'D4',
-        0xd5: 'D5',
-        0xd8: 'D8',
-        0xd9: 'D9',
-        0xda: 'P0',
-        0xdb: 'P1',
-        0xdc: 'P2',
-    }
+    def __init__(self, *args, **kwargs):
+        """Init."""
+        super().__init__(*args, **kwargs)
+        # resolved on first use, the device may not be set up yet
+        self._remote_at = None
 
     async def command(self, command, *args,
                       manufacturer=None, expect_reply=True):
         """Xbee change pin state command, requires zigpy_xbee."""
-        pin_name = self.ep_id_2_pin.get(self._endpoint.endpoint_id)
+        idx = self._endpoint.endpoint_id - 0xd0
+        pin_name = (_EP_LOW_TO_PIN[idx]
+                    if 0 <= idx < len(_EP_LOW_TO_PIN) else None)
         if command not in [0, 1] or pin_name is None:
             return super().command(command, *args)
         if command == 0:
             pin_cmd = DIO_PIN_LOW
         else:
             pin_cmd = DIO_PIN_HIGH
-        await self._endpoint.device.remote_at(pin_name, pin_cmd)
+        remote_at = self._remote_at
+        if remote_at is None:
+            remote_at = self._remote_at = self._endpoint.device.remote_at
+        await remote_at(pin_name, pin_cmd)
         return 0, foundation.Status.SUCCESS
 
 
@@ -160,6 +171,12 @@ class XBee3Sensor(CustomDevice):
 
         cluster_id = XBEE_IO_CLUSTER
 
+        def __init__(self, *args, **kwargs):
+            """Init."""
+            super().__init__(*args, **kwargs)
+            self._last_pins_mask = 0
+            self._last_samples_mask = 0
+
         def handle_cluster_general_request(self, tsn, command_id, args):
             """Handle the cluster general request.
 
@@ -167,56 +184,60 @@ class XBee3Sensor(CustomDevice):
             """
             if command_id == ON_OFF_CMD:
                 values = args[0]
-                if 'digital_pins' in values and 'digital_samples' in values:
+                if isinstance(values, IOSampleResult):
                     # Update digital inputs
-                    active_pins = [i for i, x in enumerate(
-                        values['digital_pins']) if x == 1]
-                    for pin in active_pins:
+                    device = self._endpoint.device
+                    attr = OnOff.ep_attribute
+                    pins = values.digital_pins_mask
+                    samples = values.digital_samples_mask & pins
+                    # only update pins that changed or were not reported
+                    changed_pins = (
+                        (samples ^ self._last_samples_mask) |
+                        ~self._last_pins_mask) & pins
+                    self._last_pins_mask = pins
+                    self._last_samples_mask = samples
+                    while changed_pins:
+                        # take the lowest set bit and clear it
+                        pin = (changed_pins & -changed_pins).bit_length() - 1
+                        changed_pins &= changed_pins - 1
+                        ep_id = _PIN_TO_EP[pin]
+                        if ep_id is None:
+                            continue
+                        cluster = getattr(device[ep_id], attr)
                         # pylint: disable=W0212
-                        self._endpoint.device.__getitem__(
-                            ENDPOINT_MAP[pin]).__getattr__(
-                                OnOff.ep_attribute)._update_attribute(
-                                    ON_OFF_CMD, values['digital_samples'][pin])
+                        cluster._update_attribute(
+                            ON_OFF_CMD, (samples >> pin) & 1)
             else:
                 super().handle_cluster_general_request(tsn, command_id, args)
 
         def deserialize(self, tsn, frame_type, is_reply, command_id, data):
             """Deserialize."""
             if frame_type == 1:
-                # Cluster command
+                # Cluster command, always an IO sample whose digital mask
+                # was read as the tsn and command id
                 if is_reply:
                     commands = self.client_commands
                 else:
                     commands = self.server_commands
 
                 try:
-                    schema = commands[command_id][1]
-                    is_reply = commands[command_id][2]
-                except KeyError:
-                    data = struct.pack(
-                        '>i',
-                        tsn)[-1:] + struct.pack('>i', command_id)[-1:] + data
-                    new_command_id = ON_OFF_CMD
-                    try:
-                        schema = commands[new_command_id][1]
-                        is_reply = commands[new_command_id][2]
-                    except KeyError:
-                        _LOGGER.warning(
-                            "Unknown cluster-specific command %s", command_id)
-                        return tsn, command_id + 256, is_reply, data
-                    value, data = t.deserialize(data, schema)
-                    return tsn, new_command_id, is_reply, value
-                # Bad hack to differentiate foundation vs cluster
-                command_id = command_id + 256
-            else:
-                # General command
-                try:
-                    schema = foundation.COMMANDS[command_id][1]
-                    is_reply = foundation.COMMANDS[command_id][2]
+                    entry = commands[ON_OFF_CMD]
                 except KeyError:
                     _LOGGER.warning(
-                        "Unknown foundation command %s", command_id)
-                    return tsn, command_id, is_reply, data
+                        "Unknown cluster-specific command %s", command_id)
+                    return tsn, command_id + 256, is_reply, data
+                data = _TSN_COMMAND_ID.pack(
+                    tsn & 0xff, command_id & 0xff) + data
+                value, data = t.deserialize(data, entry[1])
+                return tsn, ON_OFF_CMD, entry[2], value
+
+            # General command
+            try:
+                schema = foundation.COMMANDS[command_id][1]
+                is_reply = foundation.COMMANDS[command_id][2]
+            except KeyError:
+                _LOGGER.warning("Unknown foundation command %s", command_id)
+                return tsn, command_id, is_reply, data
 
             value, data = t.deserialize(data, schema)
             if data != b'':